@@ -89,4 +89,6 @@ RobotJointsDict = {
     "robot_calf_l":  [None, "robot_calf_l_pitch_joint", None],                                               # 机器人 左小腿
     "robot_foot_r":  ["robot_foot_r_roll_joint", "robot_foot_r_pitch_joint", None],                          # 机器人 右脚
     "robot_foot_l":  ["robot_foot_l_roll_joint", "robot_foot_l_pitch_joint", None],                          # 机器人 左脚
-}
\ No newline at end of file
+}
+# 机器人关节顺序列表 [joint_name]（关节状态数组下标顺序）
+RobotJointNameList = [joint_name for joint_name_list in RobotJointsDict.values() for joint_name in joint_name_list if joint_name is not None]
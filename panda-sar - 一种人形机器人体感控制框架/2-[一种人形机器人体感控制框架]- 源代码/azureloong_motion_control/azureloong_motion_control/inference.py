@@ -0,0 +1,325 @@
+# coding:UTF-8
+import os
+import math
+import time
+import threading
+from typing import Callable
+import numpy as np
+import onnxruntime as ort
+from robot import RobotIMUs
+from config import RobotJointNameList, IMU_DeviceData
+
+# 默认策略模型：SZPU/dudonglong/gewu.onnx（ML-Agents 导出，obs_0 [batch, 34] -> actions [batch, 12]）
+DEFAULT_MODEL_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "SZPU", "dudonglong", "gewu.onnx"))
+
+# 默认策略控制关节列表（左腿、右腿，与模型动作维度一一对应；可通过 PolicyRunner(joint_names=...) 替换）
+PolicyJointNameList = [
+    "robot_thigh_l_roll_joint", "robot_thigh_l_pitch_joint", "robot_thigh_l_yaw_joint",
+    "robot_calf_l_pitch_joint", "robot_foot_l_roll_joint", "robot_foot_l_pitch_joint",
+    "robot_thigh_r_roll_joint", "robot_thigh_r_pitch_joint", "robot_thigh_r_yaw_joint",
+    "robot_calf_r_pitch_joint", "robot_foot_r_roll_joint", "robot_foot_r_pitch_joint",
+]
+
+# 默认躯干状态字段列表（可通过 PolicyRunner(body_fields=...) 替换）
+BodyStateFieldList = ["roll", "pitch", "yaw", "AsX", "AsY", "AsZ", "AccX", "AccY", "AccZ"]
+BODY_ANGLE_FIELDS = ("roll", "pitch", "yaw")        # 姿态角弧度，规范化到 [-π, π)
+BODY_RATE_FIELDS = ("AsX", "AsY", "AsZ")            # 角速度，度每秒 -> 弧度每秒
+
+# 观测向量布局：关节角(n) + 关节角速度(n) + 躯干状态(len(body_fields))，不足模型输入宽度的部分补零
+# 注意：仓库未记录 gewu.onnx 训练时的观测布局，默认值仅为约定，请按实际训练布局传入 joint_names / body_fields
+
+
+def wrap_Angle(angle: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """ 将角弧度从 [0, 2π) 等任意范围规范化到 [-π, π)
+    :param angle: np.ndarray        输入角弧度
+    :param out: np.ndarray | None   输出缓冲区（可与输入相同，原地计算）
+    :return: np.ndarray             规范化后的角弧度
+    """
+    out = np.add(angle, math.pi, out=out)
+    np.remainder(out, 2 * math.pi, out=out)
+    out -= math.pi
+    return out
+
+
+def _percentiles(samples: np.ndarray, count: int, history: int) -> dict:
+    """ 计算统计窗口内样本的百分位数（毫秒）
+    :param samples: np.ndarray  样本环形缓冲区（秒）
+    :param count: int           累计样本数
+    :param history: int         统计窗口
+    :return: dict               {"count", "p50", "p90", "p99", "max"}
+    """
+    window = samples[:min(count, history)] * 1000.0
+    if len(window) == 0:
+        return {"count": 0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p90, p99 = np.percentile(window, [50, 90, 99])
+    return {"count": count, "p50": float(p50), "p90": float(p90), "p99": float(p99), "max": float(window.max())}
+
+
+class PolicyRunner:
+    """ gewu.onnx 策略 CPU 推理器
+
+    模型只加载一次，输入输出缓冲区预分配并通过 IOBinding 绑定，每步直接从关节状态数组填充观测向量。
+    """
+    modelPath = DEFAULT_MODEL_PATH  # 模型路径
+    rate = 50.0                     # 控制频率 (Hz)
+    threads = 1                     # 推理线程数
+    cpuAffinity = None              # 绑定的 CPU 核心列表
+    history = 4096                  # 延迟统计窗口（步数）
+    isOpen = False                  # 控制循环开启标志
+    callback_method = None          # 动作输出回调方法
+
+    def __init__(self, model_path: str = None, rate: float = None, threads: int = None,
+                 cpu_affinity: list = None, history: int = None, callback_method: Callable = None,
+                 joint_names: list = None, body_fields: list = None):
+        """ 初始化推理器
+        :param model_path: str | None            模型路径 (默认: SZPU/dudonglong/gewu.onnx)
+        :param rate: float | None                控制频率 (默认: 50 Hz)
+        :param threads: int | None               推理线程数 (默认: 1)
+        :param cpu_affinity: list | None         绑定的 CPU 核心列表，首个核心用于控制线程 (默认: 不绑定)
+        :param history: int | None               延迟统计窗口 (默认: 4096 步)
+        :param callback_method: Callable | None  动作输出回调方法 callback(actions: np.ndarray)
+        :param joint_names: list | None          观测/动作关节顺序 (默认: PolicyJointNameList)
+        :param body_fields: list | None          观测中的躯干状态字段顺序 (默认: BodyStateFieldList)
+        """
+        if model_path is not None: self.modelPath = model_path                          # 模型路径
+        if rate is not None: self.rate = rate                                           # 控制频率
+        if threads is not None: self.threads = threads                                  # 推理线程数
+        if cpu_affinity is not None: self.cpuAffinity = list(cpu_affinity)              # CPU 核心列表
+        if history is not None: self.history = history                                  # 延迟统计窗口
+        if callback_method is not None: self.callback_method = callback_method          # 动作输出回调方法
+        self.isOpen = False
+        # 初始化：观测布局
+        self.jointNameList = list(joint_names) if joint_names is not None else list(PolicyJointNameList)
+        self.bodyFieldList = list(body_fields) if body_fields is not None else list(BodyStateFieldList)
+        for name in self.jointNameList:
+            if name not in RobotJointNameList:
+                raise ValueError(f"unknown joint: {name}")
+        for field in self.bodyFieldList:
+            if field not in BODY_ANGLE_FIELDS and not isinstance(IMU_DeviceData.get(field), float):
+                raise ValueError(f"unknown body field: {field}")
+        n = len(self.jointNameList)
+        self.bodyOffset = 2 * n                                                         # 躯干状态起始下标
+        self.layoutSize = 2 * n + len(self.bodyFieldList)                               # 布局占用宽度
+        # 初始化：推理会话（顺序执行，单个 inter-op 线程）
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        if self.cpuAffinity is not None and self.threads > 1:
+            # 推理工作线程（主线程除外）依次绑定到其余核心（ONNX Runtime 处理器编号从 1 开始）
+            cores = self.cpuAffinity[1:] or self.cpuAffinity
+            options.add_session_config_entry("session.intra_op_thread_affinities",
+                                             ";".join(str(cores[i % len(cores)] + 1) for i in range(self.threads - 1)))
+        self.session = ort.InferenceSession(self.modelPath, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        outputs = {output.name: output for output in self.session.get_outputs()}
+        model_output = outputs.get("deterministic_continuous_actions", outputs.get("continuous_actions"))
+        if model_output is None:
+            raise ValueError(f"model has no continuous action output: {list(outputs)}")
+        self.inputName = model_input.name
+        self.outputName = model_output.name
+        self.observationSize = model_input.shape[1]
+        self.actionSize = model_output.shape[1]
+        if self.observationSize < self.layoutSize:
+            raise ValueError(f"model input width {self.observationSize} < observation size {self.layoutSize}")
+        if self.actionSize != n:
+            raise ValueError(f"model action width {self.actionSize} != {n} policy joints")
+        # 初始化：预分配输入输出缓冲区并绑定
+        self.observation = np.zeros((1, self.observationSize), dtype=np.float32)
+        self.actions = np.zeros((1, self.actionSize), dtype=np.float32)
+        self.binding = self.session.io_binding()
+        self.binding.bind_input(self.inputName, "cpu", 0, np.float32, self.observation.shape, self.observation.ctypes.data)
+        self.binding.bind_output(self.outputName, "cpu", 0, np.float32, self.actions.shape, self.actions.ctypes.data)
+        # 初始化：观测构建缓冲区
+        self.jointIndex = np.array([RobotJointNameList.index(name) for name in self.jointNameList], dtype=np.intp)
+        self.positions = np.zeros(n, dtype=np.float64)
+        self.lastPositions = np.zeros(n, dtype=np.float64)
+        self.velocities = np.zeros(n, dtype=np.float64)
+        self.bodyAngleIndex = np.array([self.bodyOffset + idx for idx, field in enumerate(self.bodyFieldList)
+                                        if field in BODY_ANGLE_FIELDS], dtype=np.intp)
+        self.bodyAngles = np.zeros(len(self.bodyAngleIndex), dtype=np.float32)
+        self.isFirstStep = True
+        # 初始化：延迟统计（单步：观测构建 + 推理；循环：关节复制 + 单步 + 回调；抖动：唤醒时间 - 截止时间）
+        self.latencies = np.zeros(self.history, dtype=np.float64)
+        self.loopLatencies = np.zeros(self.history, dtype=np.float64)
+        self.jitters = np.zeros(self.history, dtype=np.float64)
+        self.steps = 0
+        self.loops = 0
+        self.missedDeadlines = 0
+
+    def build_Observation(self, joints: np.ndarray, body: np.ndarray = None):
+        """ 从关节状态数组原地填充观测向量
+        :param joints: np.ndarray        关节角弧度数组（RobotJointNameList 顺序）
+        :param body: np.ndarray | None   躯干状态（body_fields 顺序）
+        """
+        n = len(self.jointNameList)
+        np.take(joints, self.jointIndex, out=self.positions)
+        wrap_Angle(self.positions, out=self.positions)                     # [0, 2π) -> [-π, π)
+        if self.isFirstStep:
+            self.lastPositions[:] = self.positions
+            self.isFirstStep = False
+        np.subtract(self.positions, self.lastPositions, out=self.velocities)
+        wrap_Angle(self.velocities, out=self.velocities)                   # 跨越 ±π 时取最小角差
+        self.velocities *= self.rate
+        self.lastPositions[:] = self.positions
+        observation = self.observation[0]
+        observation[:n] = self.positions
+        observation[n:2 * n] = self.velocities
+        if body is not None:
+            observation[self.bodyOffset:self.layoutSize] = body
+            if len(self.bodyAngleIndex):
+                # 躯干姿态 [-π, π)：经预分配缓冲区原地规范化
+                np.take(observation, self.bodyAngleIndex, out=self.bodyAngles)
+                wrap_Angle(self.bodyAngles, out=self.bodyAngles)
+                np.put(observation, self.bodyAngleIndex, self.bodyAngles)
+
+    def step(self, joints: np.ndarray, body: np.ndarray = None) -> np.ndarray:
+        """ 执行单步推理
+        :param joints: np.ndarray        关节角弧度数组（RobotJointNameList 顺序）
+        :param body: np.ndarray | None   躯干状态
+        :return: np.ndarray              动作数组（joint_names 顺序，复用缓冲区）
+        """
+        start = time.perf_counter()                     # 计时：观测构建 -> 动作就绪
+        self.build_Observation(joints, body)
+        self.session.run_with_iobinding(self.binding)
+        self.latencies[self.steps % self.history] = time.perf_counter() - start
+        self.steps += 1
+        return self.actions[0]
+
+    def reset(self):
+        """ 重置关节角速度差分与统计
+        """
+        self.isFirstStep = True
+        self.steps = 0
+        self.loops = 0
+        self.missedDeadlines = 0
+
+    def read_BodyState(self, body_IMU, out: np.ndarray):
+        """ 按 body_fields 顺序读取躯干传感器状态
+        :param body_IMU: LimbIMU   躯干传感器
+        :param out: np.ndarray     输出缓冲区
+        """
+        for idx, field in enumerate(self.bodyFieldList):
+            if field == "roll": out[idx] = body_IMU.roll
+            elif field == "pitch": out[idx] = body_IMU.pitch
+            elif field == "yaw": out[idx] = body_IMU.yaw
+            elif field in BODY_RATE_FIELDS: out[idx] = math.radians(body_IMU.deviceData[field])
+            else: out[idx] = body_IMU.deviceData[field]
+
+    def run(self, robot, steps: int = None):
+        """ 以固定控制频率运行推理（阻塞，直到 stop() 或达到步数）
+        （仅支持 RobotIMUs；RobotIMUsPipeline 没有 robotJointsRotationArray / robotLimbIMUList。）
+        :param robot: RobotIMUs   关节状态来源
+        :param steps: int | None  运行步数 (默认: 不限)
+        """
+        if not isinstance(robot, RobotIMUs):
+            raise TypeError(f"run() requires RobotIMUs, got {type(robot).__name__}")
+        previous_affinity = None
+        if self.cpuAffinity is not None:
+            previous_affinity = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, self.cpuAffinity[:1])      # 绑定：控制线程（退出时恢复）
+        source = np.frombuffer(robot.robotJointsRotationArray, dtype=np.float64)   # 接收线程写入的数组视图
+        joints = np.empty_like(source)                                              # 每步一致的关节状态副本
+        body_IMU = robot.robotLimbIMUList["robot_body"]
+        body = np.zeros(len(self.bodyFieldList), dtype=np.float64)
+        period = 1.0 / self.rate
+        deadline = time.perf_counter()
+        self.isOpen = True
+        count = 0
+        try:
+            while self.isOpen and (steps is None or count < steps):
+                start = time.perf_counter()
+                self.jitters[self.loops % self.history] = start - deadline                  # 唤醒抖动
+                self.read_BodyState(body_IMU, body)
+                # 关节状态：在与 update_RobotJointsMotion 共用的锁内整体复制，避免混入两次更新的数据
+                with robot.robotJointsLock:
+                    joints[:] = source
+                actions = self.step(joints, body)
+                if self.callback_method is not None:
+                    self.callback_method(actions)
+                self.loopLatencies[self.loops % self.history] = time.perf_counter() - start
+                self.loops += 1
+                count += 1
+                # 固定频率调度：按绝对截止时间休眠，落后超过一个周期则跳过并计数
+                deadline += period
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.missedDeadlines += 1
+                    if -delay > period: deadline = time.perf_counter()
+        finally:
+            self.isOpen = False
+            if previous_affinity is not None:
+                os.sched_setaffinity(0, previous_affinity)     # 恢复：调用线程原有的 CPU 绑定
+
+    def start(self, robot):
+        """ 在独立线程中启动控制循环
+        :param robot: RobotIMUs  关节状态来源
+        """
+        self.isOpen = True
+        self.thread = threading.Thread(target=self.run, args=(robot,))
+        self.thread.start()
+
+    def stop(self):
+        """ 停止控制循环
+        """
+        self.isOpen = False
+        if getattr(self, "thread", None) is not None:
+            self.thread.join()
+            self.thread = None
+
+    def evaluate_Episodes(self, episodes: list, batch_size: int = 1024) -> list:
+        """ 批量评估已录制的数据片段
+        :param episodes: list    片段列表，每项为 joints [T, len(RobotJointNameList)] 或 (joints, body [T, len(body_fields)])
+        :param batch_size: int   单次推理的最大批大小
+        :return: list            每个片段的动作数组 [T, len(joint_names)]
+        """
+        n = len(self.jointNameList)
+        lengths = []
+        blocks = []
+        for episode in episodes:
+            joints, body = episode if isinstance(episode, tuple) else (episode, None)
+            positions = wrap_Angle(np.asarray(joints, dtype=np.float64)[:, self.jointIndex])
+            block = np.zeros((len(positions), self.observationSize), dtype=np.float32)
+            block[:, :n] = positions
+            block[1:, n:2 * n] = wrap_Angle(np.diff(positions, axis=0)) * self.rate    # 首步角速度为零
+            if body is not None:
+                block[:, self.bodyOffset:self.layoutSize] = body
+                block[:, self.bodyAngleIndex] = wrap_Angle(block[:, self.bodyAngleIndex])
+            blocks.append(block)
+            lengths.append(len(positions))
+        observations = np.concatenate(blocks) if blocks else np.zeros((0, self.observationSize), dtype=np.float32)
+        actions = np.empty((len(observations), self.actionSize), dtype=np.float32)
+        for start in range(0, len(observations), batch_size):
+            chunk = observations[start:start + batch_size]
+            actions[start:start + len(chunk)] = self.session.run([self.outputName], {self.inputName: chunk})[0]
+        return np.split(actions, np.cumsum(lengths)[:-1]) if lengths else []
+
+    def latency_Percentiles(self) -> dict:
+        """ 延迟统计（毫秒）
+        顶层为单步延迟（观测构建 -> 动作就绪）；"loop" 为控制循环单次耗时（含关节复制与回调）；
+        "jitter" 为控制循环相对截止时间的唤醒延迟。
+        :return: dict  {"count", "p50", "p90", "p99", "max", "missed", "loop": {...}, "jitter": {...}}
+        """
+        result = _percentiles(self.latencies, self.steps, self.history)
+        result["missed"] = self.missedDeadlines
+        result["loop"] = _percentiles(self.loopLatencies, self.loops, self.history)
+        result["jitter"] = _percentiles(self.jitters, self.loops, self.history)
+        return result
+
+
+if __name__ == '__main__':
+    # 离线测速：零输入单步推理
+    runner = PolicyRunner(threads=1)
+    joints = np.zeros(len(RobotJointNameList), dtype=np.float64)
+    for _ in range(2000):
+        runner.step(joints)
+    print(runner.latency_Percentiles())
+    # 批量评估：8 个随机片段
+    episodes = [np.random.uniform(-0.5, 0.5, (500, len(RobotJointNameList))) for _ in range(8)]
+    start = time.perf_counter()
+    results = runner.evaluate_Episodes(episodes)
+    print(f"batched: {sum(len(r) for r in results)} steps in {(time.perf_counter() - start) * 1000.0:.1f} ms")
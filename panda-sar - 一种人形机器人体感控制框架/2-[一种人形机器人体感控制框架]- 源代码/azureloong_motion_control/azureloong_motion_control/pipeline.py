@@ -0,0 +1,479 @@
+# coding:UTF-8
+import time
+import socket
+import threading
+import multiprocessing
+from typing import Callable
+from multiprocessing import shared_memory
+from device import LimbIMU
+from algorithm import calculate_AngleDifference
+from config import LimbsDict, RobotJointsDict, DeviceLookupLimbDict
+
+# 共享内存环形缓冲区布局
+RING_SLOT_PAYLOAD = 1024            # 单个槽位数据区字节数（与 recvfrom(1024) 一致）
+RING_SLOT_HEADER = 16               # 单个槽位头部字节数 [seq: uint64, length: uint32, ipv4: uint32]
+RING_SLOT_SIZE = RING_SLOT_HEADER + RING_SLOT_PAYLOAD
+RING_HEADER_SIZE = 64 * 8           # 环形缓冲区头部字节数（64 个 uint64）
+MAX_WORKERS = 8                     # 计算进程数量上限
+
+# 环形缓冲区头部索引（uint64）
+HDR_WRITE_SEQ = 0                   # 接收进程写入序号
+HDR_RECEIVED = 1                    # 已接收数据报计数
+HDR_DROPPED = 2                     # 背压丢弃计数（"drop" 策略）
+HDR_BLOCKED = 3                     # 背压等待计数（"block" 策略）
+HDR_CALIBRATE = 4                   # 校准请求序号
+HDR_READ_SEQ = 8                    # 计算进程读取序号 [8, 16)
+HDR_OVERRUN = 16                    # 计算进程溢出计数 [16, 24)
+HDR_FRAMES = 24                     # 计算进程解析帧计数 [24, 32)
+HDR_CALIBRATED = 32                 # 计算进程已应用的校准序号 [32, 40)
+
+# 肢体结果表布局（每个肢体 8 个 8 字节字段）
+TABLE_ROW = 8                       # [gen: uint64, roll, pitch, yaw, calibrate, seen, 保留, 保留]
+LimbNameList = list(LimbsDict.keys())                       # 肢体顺序（结果表行号）
+LimbIndexDict = {limb_name: idx for idx, limb_name in enumerate(LimbNameList)}
+READ_RETRIES = 1000                 # 序号锁读取重试上限（写入进程被终止时行可能永久处于写入中）
+NOT_READY_ROW = [0.0, 0.0, 0.0, -1.0, 0.0]                  # 读取失败时返回的行（未在线、校准序号不匹配）
+
+FRAME_SIZE = 54                     # 传感器数据帧字节数
+FRAME_HEADER = b"WT"                # 传感器数据帧头
+
+
+def _read_LimbRow(table_q: memoryview, table_d: memoryview, row: int) -> list:
+    """ 无锁读取肢体结果表中的一行（序号锁，写入期间有限次重试）
+    :param table_q: memoryview  结果表 uint64 视图
+    :param table_d: memoryview  结果表 double 视图
+    :param row: int             行号
+    :return: list               [roll, pitch, yaw, calibrate, seen]，重试耗尽时返回 NOT_READY_ROW
+    """
+    base = row * TABLE_ROW
+    for _ in range(READ_RETRIES):
+        gen = table_q[base]
+        if gen & 1:                                     # 写入中：让出 CPU 后重试
+            time.sleep(0)
+            continue
+        values = table_d[base + 1:base + 6].tolist()
+        if table_q[base] == gen:                        # 读取期间未被改写
+            return values
+    return list(NOT_READY_ROW)
+
+
+def _receiver_main(ring: shared_memory.SharedMemory, port: int, capacity: int, workers: int,
+                   policy: str, rcvbuf: int, stop_event):
+    """ 接收进程：只负责将套接字数据报搬运到共享内存环形缓冲区
+    :param ring: SharedMemory    环形缓冲区
+    :param port: int             UDP 端口号
+    :param capacity: int         槽位数量
+    :param workers: int          计算进程数量
+    :param policy: str           缓冲区满时的背压策略 ("overwrite" | "drop" | "block")
+    :param rcvbuf: int           套接字接收缓冲区字节数 (0: 系统默认)
+    :param stop_event: Event     停止事件
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if rcvbuf > 0: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind(("0.0.0.0", port))
+    sock.settimeout(0.1)
+    header = ring.buf[:RING_HEADER_SIZE].cast('Q')
+    slots = ring.buf[RING_HEADER_SIZE:]
+    scratch = bytearray(RING_SLOT_PAYLOAD)              # "drop" 策略下的丢弃缓冲区
+    seq = header[HDR_WRITE_SEQ]
+    waiting = False
+    try:
+        while not stop_event.is_set():
+            # 背压检测：最慢的计算进程落后一整圈时缓冲区已满
+            if policy != "overwrite":
+                slowest = min(header[HDR_READ_SEQ + k] for k in range(workers))
+                if seq - slowest >= capacity:
+                    if policy == "drop":
+                        try:
+                            sock.recv_into(scratch)     # 继续排空套接字，丢弃最新数据报
+                        except socket.timeout:
+                            continue
+                        header[HDR_DROPPED] += 1
+                    else:
+                        if not waiting: header[HDR_BLOCKED] += 1
+                        waiting = True
+                        time.sleep(0.0005)
+                    continue
+            waiting = False
+            offset = (seq % capacity) * RING_SLOT_SIZE
+            slot = slots[offset:offset + RING_SLOT_SIZE]
+            slot_q = slot[:8].cast('Q')
+            slot_i = slot[8:RING_SLOT_HEADER].cast('I')
+            slot_q[0] = 0                               # 标记：槽位写入中
+            try:
+                length, ip_address = sock.recvfrom_into(slot[RING_SLOT_HEADER:])
+            except socket.timeout:
+                slot_q.release(); slot_i.release(); slot.release()
+                continue
+            slot_i[0] = length
+            slot_i[1] = int.from_bytes(socket.inet_aton(ip_address[0]), "big")
+            slot_q[0] = seq + 1                         # 发布：槽位序号
+            seq += 1
+            header[HDR_WRITE_SEQ] = seq
+            header[HDR_RECEIVED] += 1
+            slot_q.release(); slot_i.release(); slot.release()
+    finally:
+        sock.close()
+        header.release()
+        slots.release()
+
+
+class _LimbShardWorker:
+    """ 计算进程：解析分配到的肢体传感器数据帧（含校准修正），肢体角度写回共享内存
+    """
+
+    def __init__(self, ring: shared_memory.SharedMemory, table: shared_memory.SharedMemory,
+                 index: int, workers: int, capacity: int, robotName: str):
+        ''' 初始化计算进程
+        :param ring: SharedMemory   环形缓冲区
+        :param table: SharedMemory  肢体结果表
+        :param index: int           计算进程编号
+        :param workers: int         计算进程数量
+        :param capacity: int        槽位数量
+        :param robotName: str       机器人名称
+        '''
+        self.index = index
+        self.capacity = capacity
+        self.header = ring.buf[:RING_HEADER_SIZE].cast('Q')
+        self.slots = ring.buf[RING_HEADER_SIZE:]
+        self.table_q = table.buf.cast('Q')
+        self.table_d = table.buf.cast('d')
+        self.tempBuffer = bytearray()                   # 临时缓冲区
+        self.calibrateSeq = 0                           # 已应用的校准序号
+        # 按肢体编号分片：每个肢体只由一个计算进程写入
+        self.limbIMUs = {
+            device_id: LimbIMU(robotName, limb_name, device_id)
+            for device_id, limb_name in DeviceLookupLimbDict.items()
+            if LimbIndexDict[limb_name] % workers == index
+        }
+
+    def run(self, stop_event):
+        ''' 消费环形缓冲区，直到停止事件被设置
+        :param stop_event: Event  停止事件
+        '''
+        read_seq = self.header[HDR_WRITE_SEQ]
+        self.header[HDR_READ_SEQ + self.index] = read_seq
+        while not stop_event.is_set():
+            self.apply_Calibration()
+            write_seq = self.header[HDR_WRITE_SEQ]
+            if write_seq == read_seq:
+                time.sleep(0.0002)
+                continue
+            # 溢出检测：接收进程已覆盖未读取的槽位
+            if write_seq - read_seq > self.capacity:
+                self.header[HDR_OVERRUN + self.index] += write_seq - read_seq - self.capacity
+                read_seq = write_seq - self.capacity
+            offset = (read_seq % self.capacity) * RING_SLOT_SIZE
+            slot_q = self.slots[offset:offset + 8].cast('Q')
+            slot_i = self.slots[offset + 8:offset + RING_SLOT_HEADER].cast('I')
+            length = slot_i[0]
+            ipv4 = slot_i[1]
+            data = bytes(self.slots[offset + RING_SLOT_HEADER:offset + RING_SLOT_HEADER + length])
+            valid = slot_q[0] == read_seq + 1           # 复制期间未被覆盖
+            slot_q.release(); slot_i.release()
+            read_seq += 1
+            self.header[HDR_READ_SEQ + self.index] = read_seq
+            if valid:
+                self.onDatagram(data, socket.inet_ntoa(ipv4.to_bytes(4, "big")))
+            else:
+                self.header[HDR_OVERRUN + self.index] += 1
+
+    def onDatagram(self, data: bytes, ip_address: str):
+        ''' 数据帧提取与解析
+        :param data: bytes        数据报
+        :param ip_address: str    设备 IPv4 地址
+        '''
+        self.tempBuffer += data
+        start = 0
+        while True:
+            start = self.tempBuffer.find(FRAME_HEADER, start)
+            if start < 0 or len(self.tempBuffer) - start < FRAME_SIZE:
+                break
+            device_id = bytes(self.tempBuffer[start:start + 12]).decode('ascii', errors='replace')
+            if device_id not in DeviceLookupLimbDict:   # 防错措施：伪帧头，继续搜索
+                start += 1
+                continue
+            limb_IMU = self.limbIMUs.get(device_id)
+            if limb_IMU is not None:                    # 跳过：其它计算进程负责的肢体
+                try:
+                    limb_IMU.onDataReceived(bytes(self.tempBuffer[start:start + FRAME_SIZE]))
+                    limb_IMU.setIPv4Address(ip_address)
+                    self.update_LimbRow(limb_IMU)
+                    self.header[HDR_FRAMES + self.index] += 1
+                except Exception:
+                    print("Error onDatagram")
+            start += FRAME_SIZE
+        if start < 0:
+            # 保留末尾可能是帧头的一个字节
+            del self.tempBuffer[:max(len(self.tempBuffer) - 1, 0)]
+        else:
+            del self.tempBuffer[:start]
+
+    def update_LimbRow(self, limb_IMU: LimbIMU):
+        ''' 将肢体绝对运动角弧度及其校准序号写入结果表
+        （相对于上级的运动矩阵在读取时由同一组肢体角度计算，见 RobotIMUsPipeline.motionMatrix）
+        :param limb_IMU: LimbIMU  肢体传感器
+        '''
+        base = LimbIndexDict[limb_IMU.limbName] * TABLE_ROW
+        gen = self.table_q[base]
+        self.table_q[base] = gen + 1                    # 序号锁：写入中（奇数）
+        self.table_d[base + 1] = limb_IMU.roll
+        self.table_d[base + 2] = limb_IMU.pitch
+        self.table_d[base + 3] = limb_IMU.yaw
+        self.table_d[base + 4] = float(self.calibrateSeq)
+        self.table_d[base + 5] = 1.0
+        self.table_q[base] = gen + 2                    # 序号锁：写入完成（偶数）
+
+    def apply_Calibration(self):
+        ''' 应用主进程发出的校准请求
+        '''
+        request = self.header[HDR_CALIBRATE]
+        if request != self.calibrateSeq:
+            for limb_IMU in self.limbIMUs.values():
+                if request > 0: limb_IMU.calibrate()        # 校准请求
+                else: limb_IMU.exitCalibration()            # 退出校准请求（序号为 0）
+            self.calibrateSeq = request
+            self.header[HDR_CALIBRATED + self.index] = request
+
+    def close(self):
+        ''' 释放共享内存视图
+        '''
+        self.header.release()
+        self.slots.release()
+        self.table_q.release()
+        self.table_d.release()
+
+
+def _worker_main(ring: shared_memory.SharedMemory, table: shared_memory.SharedMemory,
+                 index: int, workers: int, capacity: int, robotName: str, stop_event):
+    """ 计算进程入口
+    """
+    worker = _LimbShardWorker(ring, table, index, workers, capacity, robotName)
+    try:
+        worker.run(stop_event)
+    finally:
+        worker.close()
+
+
+class RobotIMUsPipeline:
+    """ 多进程接收/计算流水线
+
+    接收进程只将 UDP 数据报写入共享内存环形缓冲区，一个或多个计算进程按肢体分片解析数据帧并写入肢体角度，
+    结果通过共享内存返回主进程。回调方法在主进程的独立线程中执行，不会阻塞接收。
+    """
+    robotName = "AzureLoong"        # 机器人名称
+    port = 1399                     # UDP 端口号
+    workers = 1                     # 计算进程数量
+    capacity = 4096                 # 环形缓冲区槽位数量
+    policy = "overwrite"            # 背压策略 ("overwrite" | "drop" | "block")
+    rcvbuf = 0                      # 套接字接收缓冲区字节数 (0: 系统默认)
+    isOpen = False                  # 流水线开启标志
+    isCalibrated = False            # 传感器校准标志
+    callback_method = None          # 数据更新回调方法
+
+    def __init__(self, robot_name: str = None, port: int = None, callback_method: Callable = None,
+                 workers: int = None, capacity: int = None, policy: str = None, rcvbuf: int = None):
+        """ 初始化流水线
+        :param robot_name: str | None            机器人名称 (默认: AzureLoong)
+        :param port: int | None                  UDP服务端口 (默认: 1399)
+        :param callback_method: Callable | None  数据更新回调方法（主进程线程中调用）
+        :param workers: int | None               计算进程数量 (默认: 1，上限: 8)
+        :param capacity: int | None              环形缓冲区槽位数量 (默认: 4096)
+        :param policy: str | None                缓冲区满时的背压策略 (默认: overwrite)
+                                                   overwrite: 覆盖最旧数据，计算进程记录溢出
+                                                   drop:      丢弃最新数据，接收进程记录丢弃
+                                                   block:     暂停接收，由内核缓冲区承压
+        :param rcvbuf: int | None                套接字接收缓冲区字节数 (默认: 系统默认)
+        """
+        if robot_name is not None: self.robotName = robot_name                          # 机器人名称
+        if port is not None: self.port = port                                           # 服务端口
+        if callback_method is not None: self.callback_method = callback_method          # 数据更新回调方法
+        if workers is not None: self.workers = workers                                  # 计算进程数量
+        if capacity is not None: self.capacity = capacity                               # 槽位数量
+        if policy is not None: self.policy = policy                                     # 背压策略
+        if rcvbuf is not None: self.rcvbuf = rcvbuf                                     # 接收缓冲区
+        if not 1 <= self.workers <= MAX_WORKERS:
+            raise ValueError(f"workers must be in [1, {MAX_WORKERS}]")
+        if self.policy not in ("overwrite", "drop", "block"):
+            raise ValueError(f"unknown policy: {self.policy}")
+        self.isOpen = False
+        self.isCalibrated = False
+        self.calibrateCount = 0                                                         # 已发出的校准次数（校准序号唯一）
+        self.ring = None
+        self.table = None
+        self.processes = []
+        self.stopEvent = None
+
+    def start(self):
+        """ 启动接收进程与计算进程
+        """
+        self.ring = shared_memory.SharedMemory(create=True, size=RING_HEADER_SIZE + self.capacity * RING_SLOT_SIZE)
+        self.table = shared_memory.SharedMemory(create=True, size=len(LimbNameList) * TABLE_ROW * 8)
+        self.ring.buf[:RING_HEADER_SIZE] = bytes(RING_HEADER_SIZE)
+        self.table.buf[:] = bytes(self.table.size)
+        self.header = self.ring.buf[:RING_HEADER_SIZE].cast('Q')
+        self.table_q = self.table.buf.cast('Q')
+        self.table_d = self.table.buf.cast('d')
+        self.stopEvent = multiprocessing.Event()
+        self.processes = [
+            multiprocessing.Process(target=_worker_main, daemon=True,
+                                    args=(self.ring, self.table, k, self.workers, self.capacity, self.robotName, self.stopEvent))
+            for k in range(self.workers)
+        ]
+        self.processes.append(multiprocessing.Process(target=_receiver_main, daemon=True,
+                                                      args=(self.ring, self.port, self.capacity, self.workers,
+                                                            self.policy, self.rcvbuf, self.stopEvent)))
+        for process in self.processes:
+            process.start()
+        self.isOpen = True
+        # 开启一个线程分发数据更新回调
+        if self.callback_method is not None:
+            self.callbackThread = threading.Thread(target=self.onUpdate)
+            self.callbackThread.start()
+
+    def onUpdate(self):
+        """ 数据更新回调分发（主进程线程）
+        """
+        last = -1
+        while self.isOpen:
+            frames = sum(self.header[HDR_FRAMES + k] for k in range(self.workers))
+            if frames == last:
+                time.sleep(0.0005)
+                continue
+            last = frames
+            self.callback_method(self.snapshot())
+
+    def read_LimbRows(self) -> list:
+        """ 一次性读取所有肢体行
+        :return: list  [[roll, pitch, yaw, calibrate, seen]]（LimbNameList 顺序）
+        """
+        return [_read_LimbRow(self.table_q, self.table_d, row) for row in range(len(LimbNameList))]
+
+    def isReady(self, rows: list) -> bool:
+        """ 所有肢体均在线，且每一行都已按当前校准序号写入
+        :param rows: list  read_LimbRows() 的结果
+        :return: bool
+        """
+        calibrate = self.header[HDR_CALIBRATE]
+        return self.isCalibrated and all(row[4] > 0.0 and row[3] == calibrate for row in rows)
+
+    @property
+    def sensorsState(self) -> int:
+        """ 传感器状态位标志（由结果表的在线标记计算）
+        """
+        state = 0x0000
+        for limb_name, row in zip(LimbNameList, self.read_LimbRows()):
+            if row[4] > 0.0:
+                state |= (1 << (LimbsDict[limb_name]["num"] - 1))
+        return state
+
+    def snapshot(self) -> dict:
+        """ 读取机器人关节运动列表
+        :return: dict  {joint_name: joint_rotate_angle}
+        """
+        rows = self.read_LimbRows()
+        ready = self.isReady(rows)
+        joints = {}
+        for limb_name, joint_name_list in RobotJointsDict.items():
+            row = rows[LimbIndexDict[limb_name]]
+            for joint_idx, joint_name in enumerate(joint_name_list):
+                if joint_name is not None:
+                    joints[joint_name] = row[joint_idx] if ready else 0.0   # 滚转/俯仰/偏航关节运动角弧度
+        return joints
+
+    def motionMatrix(self) -> dict:
+        """ 读取机器人肢体运动矩阵（与 RobotIMUs.calculate_RobotLimbsMotion 一致，基于同一组肢体角度计算）
+        :return: dict  {limb_name: [roll_angle, pitch_angle, yaw_angle]}
+        """
+        rows = self.read_LimbRows()
+        if not self.isReady(rows):
+            return {limb_name: [0.0, 0.0, 0.0] for limb_name in LimbNameList}
+        matrix = {}
+        for limb_name, row in zip(LimbNameList, rows):
+            parent_limb_name = LimbsDict[limb_name]["parent"]
+            if parent_limb_name is not None:
+                parent = rows[LimbIndexDict[parent_limb_name]]
+                matrix[limb_name] = [
+                    calculate_AngleDifference(parent[0], row[0]),   # 计算：肢体相对于上级的滚转角弧度差
+                    calculate_AngleDifference(parent[1], row[1]),   # 计算：肢体相对于上级的俯仰角弧度差
+                    calculate_AngleDifference(parent[2], row[2])    # 计算：肢体相对于上级的偏航角弧度差
+                ]
+            else:
+                matrix[limb_name] = row[0:3]                        # 获取：肢体运动角弧度
+        return matrix
+
+    def calibrate_AllLimbsIMU(self) -> bool:
+        """ 校准所有肢体传感器（由计算进程异步应用）
+        :return: bool  是否校准成功
+        """
+        if self.sensorsState == 0x7FFF:
+            self.calibrateCount += 1
+            self.header[HDR_CALIBRATE] = self.calibrateCount
+            self.isCalibrated = True
+            return True
+        else:
+            self.isCalibrated = False   # 防错措施
+            return False
+
+    def exitCalibration_AllLimbsIMU(self):
+        """ 退出所有肢体传感器的校准模式（由计算进程异步应用）
+        （校准序号写 0；再次校准时使用新的序号，旧校准期间写入的行不会被误判为就绪。）
+        """
+        self.header[HDR_CALIBRATE] = 0
+        self.isCalibrated = False
+
+    def statistics(self) -> dict:
+        """ 读取流水线计数器
+        :return: dict  接收、丢弃、等待、溢出、解析帧计数及各计算进程积压
+        """
+        write_seq = self.header[HDR_WRITE_SEQ]
+        return {
+            "received": self.header[HDR_RECEIVED],
+            "dropped": self.header[HDR_DROPPED],
+            "blocked": self.header[HDR_BLOCKED],
+            "overrun": [self.header[HDR_OVERRUN + k] for k in range(self.workers)],
+            "frames": [self.header[HDR_FRAMES + k] for k in range(self.workers)],
+            "backlog": [write_seq - self.header[HDR_READ_SEQ + k] for k in range(self.workers)],
+        }
+
+    def stop(self):
+        """ 停止流水线并释放共享内存
+        """
+        if not self.isOpen:
+            return
+        self.isOpen = False             # 重置：流水线开启标志
+        # 先停止回调线程，再停止（必要时终止）子进程
+        if self.callback_method is not None:
+            self.callbackThread.join()
+        self.stopEvent.set()
+        for process in self.processes:
+            process.join(timeout=1.0)
+            if process.is_alive(): process.terminate()
+        self.header.release()
+        self.table_q.release()
+        self.table_d.release()
+        for shm in (self.ring, self.table):
+            shm.close()
+            shm.unlink()
+
+
+#######################################################################
+# 数据更新回调示例
+def updateData(jointRotaionDict: dict):
+    """
+    :param jointRotaionDict: dict  机器人关节旋转角度字典
+    :return: None
+    """
+    print(jointRotaionDict)
+
+
+if __name__ == '__main__':
+    # 加载多进程流水线
+    server = RobotIMUsPipeline(port=1399, callback_method=updateData, workers=2)
+    server.start()
+    try:
+        while True:
+            time.sleep(1.0)
+            print(server.statistics())
+    except KeyboardInterrupt:
+        server.stop()
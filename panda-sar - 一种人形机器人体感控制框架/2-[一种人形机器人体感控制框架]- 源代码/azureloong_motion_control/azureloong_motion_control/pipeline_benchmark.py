@@ -0,0 +1,124 @@
+# coding:UTF-8
+""" 接收隔离基准测试
+
+以固定速率向本机 UDP 端口发送 15 个肢体传感器的模拟数据帧，并在消费端注入固定耗时的回调负载，
+比较单线程 RobotIMUs 与多进程 RobotIMUsPipeline 的接收数据报数量。
+
+用法: python3 pipeline_benchmark.py [--rate 200] [--seconds 3] [--load-ms 2.0] [--workers 2]
+"""
+import time
+import socket
+import struct
+import argparse
+import multiprocessing
+from robot import RobotIMUs
+from pipeline import RobotIMUsPipeline
+from config import DeviceLookupLimbDict
+
+
+def build_Frame(device_id: str, tick: int) -> bytes:
+    """ 构造一帧 WT901WIFI 模拟数据（54 字节）
+    :param device_id: str  设备编号
+    :param tick: int       帧序号
+    :return: bytes         数据帧
+    """
+    angle = int((tick % 360 - 180) / 180 * 32767)
+    return struct.pack("<12s6BH16h2x", device_id.encode('ascii'),
+                       25, 1, 1, 12, 0, tick // 1000 % 60, tick % 1000,
+                       0, 0, 2048,                      # 加速度
+                       0, 0, 0,                         # 角速度
+                       0, 0, 0,                         # 磁场
+                       angle, angle // 2, angle // 3,   # 角度
+                       2500, 400, -40, 1)               # 温度、电量、信号、版本
+
+
+def send_Frames(port: int, rate: int, seconds: float, sent):
+    """ 发送进程：每个设备以 rate Hz 发送数据帧
+    :param port: int          目标端口
+    :param rate: int          每个设备的发送频率
+    :param seconds: float     发送时长
+    :param sent: Value        已发送数据报计数
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    device_ids = list(DeviceLookupLimbDict.keys())
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    end = deadline + seconds
+    tick = 0
+    while deadline < end:
+        for device_id in device_ids:
+            sock.sendto(build_Frame(device_id, tick), ("127.0.0.1", port))
+        tick += 1
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0: time.sleep(delay)
+    sent.value = tick * len(device_ids)
+    sock.close()
+
+
+def busy_Wait(milliseconds: float):
+    """ 模拟消费端计算负载（占用 CPU，不释放 GIL）
+    """
+    end = time.perf_counter() + milliseconds / 1000.0
+    while time.perf_counter() < end:
+        pass
+
+
+def run_Threaded(port: int, rate: int, seconds: float, load_ms: float) -> tuple:
+    """ 单线程接收 + 回调负载
+    :return: tuple  (已发送, 已接收)
+    """
+    received = [0]
+
+    def callback(joints: dict):
+        received[0] += 1
+        busy_Wait(load_ms)
+
+    server = RobotIMUs(port=port, callback_method=callback)
+    server.start()
+    sent = multiprocessing.Value('q', 0)
+    sender = multiprocessing.Process(target=send_Frames, args=(port, rate, seconds, sent))
+    sender.start()
+    sender.join()
+    time.sleep(0.5)                                     # 等待排空内核缓冲区
+    count = received[0]
+    server.isOpen = False
+    socket.socket(socket.AF_INET, socket.SOCK_DGRAM).sendto(b"", ("127.0.0.1", port))   # 唤醒阻塞的 recvfrom
+    server.stop()
+    return sent.value, count
+
+
+def run_Pipeline(port: int, rate: int, seconds: float, load_ms: float, workers: int) -> tuple:
+    """ 多进程流水线 + 回调负载
+    :return: tuple  (已发送, 已接收, 流水线计数器)
+    """
+    def callback(joints: dict):
+        busy_Wait(load_ms)
+
+    server = RobotIMUsPipeline(port=port, callback_method=callback, workers=workers)
+    server.start()
+    time.sleep(0.5)                                     # 等待子进程绑定端口
+    sent = multiprocessing.Value('q', 0)
+    sender = multiprocessing.Process(target=send_Frames, args=(port, rate, seconds, sent))
+    sender.start()
+    sender.join()
+    time.sleep(0.5)
+    stats = server.statistics()
+    server.stop()
+    return sent.value, stats["received"], stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RobotIMUs receive isolation benchmark")
+    parser.add_argument("--port", type=int, default=11399)
+    parser.add_argument("--rate", type=int, default=200, help="每个设备的发送频率 (Hz)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="发送时长 (s)")
+    parser.add_argument("--load-ms", type=float, default=2.0, help="每次回调的计算负载 (ms)")
+    parser.add_argument("--workers", type=int, default=2, help="计算进程数量")
+    args = parser.parse_args()
+
+    sent, received = run_Threaded(args.port, args.rate, args.seconds, args.load_ms)
+    print(f"threaded: sent={sent} received={received} loss={1 - received / max(sent, 1):.1%}")
+    sent, received, stats = run_Pipeline(args.port + 1, args.rate, args.seconds, args.load_ms, args.workers)
+    print(f"pipeline: sent={sent} received={received} loss={1 - received / max(sent, 1):.1%}")
+    print(f"pipeline: {stats}")
@@ -1,9 +1,126 @@
 # coding:UTF-8
+import time
 import socket
+import asyncio
 import threading
+from collections import deque
+from array import array
+from typing import Callable
 from device import LimbIMU
 from algorithm import switch_KeyValue, calculate_AngleDifference
-from config import LimbsDict, RobotJointsDict, DeviceLookupLimbDict
+from config import LimbsDict, RobotJointsDict, RobotJointNameList, DeviceLookupLimbDict
+
+
+class StreamSubscriber:
+    """ 异步订阅者有界队列
+
+    接收端只做 O(1) 入队，从不等待订阅者；队列满时按策略丢弃最旧数据或合并为最新数据。
+    """
+    policy = "drop_oldest"          # 队列策略 ("drop_oldest" | "coalesce")
+    maxsize = 8                     # 队列容量（coalesce 策略固定为 1）
+    delivered = 0                   # 已交付快照计数
+    dropped = 0                     # 丢弃快照计数（drop_oldest）
+    coalesced = 0                   # 合并快照计数（coalesce）
+    isClosed = False                # 订阅关闭标志
+
+    def __init__(self, maxsize: int = None, policy: str = None):
+        """ 初始化订阅者队列
+        :param maxsize: int | None  队列容量 (默认: 8)
+        :param policy: str | None   队列策略 (默认: drop_oldest)
+        """
+        if maxsize is not None: self.maxsize = maxsize
+        if policy is not None: self.policy = policy
+        if self.policy not in ("drop_oldest", "coalesce"):
+            raise ValueError(f"unknown policy: {self.policy}")
+        if self.maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.queue = deque(maxlen=1 if self.policy == "coalesce" else self.maxsize)
+        self.event = asyncio.Event()
+        self.loop = asyncio.get_running_loop()          # 订阅者所在事件循环
+        self.threadID = threading.get_ident()           # 事件循环所在线程
+        self.lock = threading.Lock()                    # 队列与计数器锁（接收线程与事件循环共用）
+        self.isWakeupPending = False                    # 跨线程唤醒回调待执行标志
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.isClosed = False
+
+    def put(self, snapshot: dict):
+        """ 入队快照（任意线程调用，不阻塞）
+        在调用线程内直接按策略写入有界队列，再唤醒订阅者；跨线程时每个订阅者最多只有一个待执行的唤醒回调。
+        :param snapshot: dict  机器人关节运动列表快照
+        """
+        with self.lock:
+            if len(self.queue) == self.queue.maxlen:
+                if self.policy == "coalesce": self.coalesced += 1
+                else: self.dropped += 1
+            self.queue.append(snapshot)                 # deque(maxlen) 自动挤出最旧数据
+        self.wakeup()
+
+    def wakeup(self):
+        """ 唤醒等待中的订阅者（线程安全）
+        """
+        if threading.get_ident() == self.threadID:
+            self.event.set()
+            return
+        with self.lock:
+            if self.isWakeupPending:                    # 已有待执行的唤醒回调
+                return
+            self.isWakeupPending = True
+        try:
+            self.loop.call_soon_threadsafe(self.onWakeup)
+        except RuntimeError:                            # 事件循环已关闭
+            pass
+
+    def onWakeup(self):
+        """ 唤醒回调（在订阅者所在事件循环中执行）
+        """
+        with self.lock:
+            self.isWakeupPending = False
+        self.event.set()
+
+    async def get(self):
+        """ 出队快照，队列为空时等待；订阅关闭后返回 None
+        :return: dict | None
+        """
+        while True:
+            with self.lock:
+                if self.queue:
+                    self.delivered += 1
+                    return self.queue.popleft()
+                if self.isClosed:
+                    return None
+                self.event.clear()
+            await self.event.wait()
+
+    def close(self):
+        """ 关闭订阅（线程安全）
+        """
+        with self.lock:
+            self.isClosed = True
+        self.wakeup()
+
+    def statistics(self) -> dict:
+        """ 读取订阅者计数器
+        :return: dict
+        """
+        return {"policy": self.policy, "maxsize": self.queue.maxlen, "queued": len(self.queue),
+                "delivered": self.delivered, "dropped": self.dropped, "coalesced": self.coalesced}
+
+
+class RobotIMUsProtocol(asyncio.DatagramProtocol):
+    """ asyncio 数据报端点协议：将数据报交给 RobotIMUs 解析
+    """
+
+    def __init__(self, robot):
+        self.robot = robot
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            self.robot.onDatagram(data, addr)           # 数据帧提取与解析
+        except:
+            print("Error datagram_received")
+        self.robot.onUpdate()                           # 数据加载与回调
 
 
 class RobotIMUs:
@@ -18,8 +135,13 @@ class RobotIMUs:
     robotLimbIMUList = {}           # 机器人肢体传感器列表 {limb_name: limb_IMU}
     robotLimbsMotionMatrix = {}     # 机器人肢体运动矩阵 {limb_name: [roll_angle, pitch_angle, yaw_angle]}
     robotJointsRotationList = {}    # 机器人关节运动列表 {joint_name: joint_rotate_angle}
+    robotJointsRotationArray = None # 机器人关节运动数组 array('d')，按 RobotJointNameList 顺序
+    robotJointsLock = None          # 机器人关节运动数组读写锁
+    callback_method = None          # 数据更新回调方法
+    transport = None                # asyncio 数据报端点
+    subscribers = []                # 异步订阅者列表 [StreamSubscriber]
 
-    def __init__(self, robot_name: str = None, port: int = None, callback_method: function = None):
+    def __init__(self, robot_name: str = None, port: int = None, callback_method: Callable = None):
         """ 初始化机器人各肢体传感器
         :param robot_name: str | None            机器人名称 (默认: AzureLoong)
         :param port: int | None                  UDP服务端口 (默认: 1399)
@@ -29,7 +151,8 @@ class RobotIMUs:
         if port is not None: self.port = port                                           # 服务端口
         if callback_method is not None: self.callback_method = callback_method          # 数据更新回调方法
         self.isOpen = False                                                             # 初始化：服务开启标志
-        self.limbLookupDeviceList = switch_KeyValue(DeviceLookupLimbDict)               # 初始化：机器人肢体查设备编号字典
+        self.subscribers = []                                                           # 初始化：异步订阅者列表
+        self.limbLookupDeviceDict = switch_KeyValue(DeviceLookupLimbDict)               # 初始化：机器人肢体查设备编号字典
         # 初始化：机器人肢体传感器列表 {limb_name: LimbIMU}
         self.robotLimbIMUList = {limb_name: LimbIMU(self.robotName, limb_name, self.limbLookupDeviceDict[limb_name]) for limb_name in LimbsDict.keys()}
         # 初始化：机器人肢体运动矩阵 {limb_name: [roll_angle, pitch_angle, yaw_angle]}
@@ -39,6 +162,10 @@ class RobotIMUs:
             for joint_name in joint_name_list:                      # 遍历：每个机器人肢体的所有关节
                 if joint_name is not None:
                     self.robotJointsRotationList[joint_name] = 0.0  # 初始化：机器人关节
+        # 初始化：机器人关节运动数组（供推理等模块免字典转换直接读取）
+        self.robotJointsRotationArray = array('d', [0.0] * len(RobotJointNameList))
+        self.robotJointsIndexDict = {joint_name: idx for idx, joint_name in enumerate(RobotJointNameList)}
+        self.robotJointsLock = threading.Lock()                     # 关节运动数组读写锁
 
     def start(self):
         """ 启动机器人传感器监听服务
@@ -58,37 +185,52 @@ class RobotIMUs:
             # 数据提取 Exact
             try:
                 data, ip_address = self.socket.recvfrom(1024)   # 接收数据
-                deviceID = None                                 # 设备编号
-                for var in data:
-                    # 逐个字节将接收到的数据存入临时缓冲区
-                    self.tempBuffer.append(var)
-                    # 校验消息头"WT"
-                    if len(self.tempBuffer) == 2 and (self.tempBuffer[0] != 0x57 or self.tempBuffer[1] != 0x54):
-                        del self.tempBuffer[0]                  # 向左对齐
-                        continue                                # 跳过：检测设备编号、数据包解析环节
-                    # 检测设备编号
-                    if len(self.tempBuffer) == 12:
-                        deviceID = bytes(self.tempBuffer).decode('ascii')          # 提取：设备编号
-                        if deviceID not in DeviceLookupLimbDict.keys():            # 防错措施
-                            self.tempBuffer.clear()                                # 重置：临时缓冲区
-                            deviceID = None                                        # 重置：设备编号
-                        else:
-                            continue                                               # 跳过：数据包解析环节
-                    # 数据包解析
-                    if len(self.tempBuffer) == 54:
-                        self.robotLimbIMUList[DeviceLookupLimbDict[deviceID]].onDataReceived(self.tempBuffer)     # 数据解析 Data Transfer
-                        self.robotLimbIMUList[DeviceLookupLimbDict[deviceID]].setIPv4Address(ip_address)          # 设置：设备 IPv4 地址
-                        self.sensor_state |= (1 << LimbsDict[DeviceLookupLimbDict[deviceID]]["num"])              # 设置：传感器状态位标志
-                        self.tempBuffer.clear()                 # 重置：临时缓冲区
-                        deviceID = None                         # 重置：设备编号
+                self.onDatagram(data, ip_address)               # 数据帧提取与解析
             except:
                 print("Error onReceive")
-            # 数据加载 Data Load
-            if self.sensor_state == 0x7FFF: self.calculate_RobotLimbsMotion()     # 计算：机器人肢体运动矩阵
-            if self.isCalibrated: self.update_RobotJointsMotion()                 # 更新：机器人关节运动列表
-            # 数据更新回调方法
-            if self.callback_method is not None:                                  # 防错措施(考虑频率控制)
-                self.callback_method(self.robotJointsRotationList)                # 调用：数据更新回调(机器人关节运动列表)
+            self.onUpdate()                                     # 数据加载与回调
+
+    def onDatagram(self, data: bytes, ip_address):
+        """ 数据帧提取与解析
+        :param data: bytes       数据报
+        :param ip_address: Any   设备地址
+        """
+        deviceID = None                                 # 设备编号
+        for var in data:
+            # 逐个字节将接收到的数据存入临时缓冲区
+            self.tempBuffer.append(var)
+            # 校验消息头"WT"
+            if len(self.tempBuffer) == 2 and (self.tempBuffer[0] != 0x57 or self.tempBuffer[1] != 0x54):
+                del self.tempBuffer[0]                  # 向左对齐
+                continue                                # 跳过：检测设备编号、数据包解析环节
+            # 检测设备编号
+            if len(self.tempBuffer) == 12:
+                deviceID = bytes(self.tempBuffer).decode('ascii')          # 提取：设备编号
+                if deviceID not in DeviceLookupLimbDict.keys():            # 防错措施
+                    self.tempBuffer.clear()                                # 重置：临时缓冲区
+                    deviceID = None                                        # 重置：设备编号
+                else:
+                    continue                                               # 跳过：数据包解析环节
+            # 数据包解析
+            if len(self.tempBuffer) == 54:
+                self.robotLimbIMUList[DeviceLookupLimbDict[deviceID]].onDataReceived(self.tempBuffer)     # 数据解析 Data Transfer
+                self.robotLimbIMUList[DeviceLookupLimbDict[deviceID]].setIPv4Address(ip_address)          # 设置：设备 IPv4 地址
+                self.sensorsState |= (1 << (LimbsDict[DeviceLookupLimbDict[deviceID]]["num"] - 1))        # 设置：传感器状态位标志
+                self.tempBuffer.clear()                 # 重置：临时缓冲区
+                deviceID = None                         # 重置：设备编号
+
+    def onUpdate(self):
+        """ 数据加载与数据更新回调
+        """
+        # 数据加载 Data Load
+        if self.sensorsState == 0x7FFF: self.calculate_RobotLimbsMotion()     # 计算：机器人肢体运动矩阵
+        if self.isCalibrated: self.update_RobotJointsMotion()                 # 更新：机器人关节运动列表
+        # 数据更新回调方法
+        if self.callback_method is not None:                                  # 防错措施(考虑频率控制)
+            self.callback_method(self.robotJointsRotationList)                # 调用：数据更新回调(机器人关节运动列表)
+        # 异步订阅者分发
+        if self.subscribers:
+            self.publish_Snapshot()
 
     def calculate_RobotLimbsMotion(self):
         ''' 计算机器人肢体运动矩阵
@@ -111,15 +253,17 @@ class RobotIMUs:
         ''' 更新机器人关节运动列表
         '''
         if self.sensorsState == 0x7FFF and self.isCalibrated:                               # 完整性措施
-            for limb_name, limb_IMU in self.robotLimbIMUList.items():                       # 遍历：机器人肢体传感器列表    
-                joint_name_list = RobotJointsDict[limb_name]                                # 获取：机器人肢体关节列表
-                for joint_idx, joint_name in enumerate(joint_name_list):
-                    if joint_name is not None:
-                        if joint_idx == 0: self.robotJointsRotationList[joint_name] = limb_IMU.roll     # 滚转关节运动角弧度 [0, 2π)
-                        elif joint_idx == 1: self.robotJointsRotationList[joint_name] = limb_IMU.pitch  # 俯仰关节运动角弧度 [0, 2π)
-                        elif joint_idx == 2: self.robotJointsRotationList[joint_name] = limb_IMU.yaw    # 偏航关节运动角弧度 [0, 2π)
+            with self.robotJointsLock:                                                      # 整体更新关节运动数组
+                for limb_name, limb_IMU in self.robotLimbIMUList.items():                   # 遍历：机器人肢体传感器列表
+                    joint_name_list = RobotJointsDict[limb_name]                            # 获取：机器人肢体关节列表
+                    for joint_idx, joint_name in enumerate(joint_name_list):
+                        if joint_name is not None:
+                            if joint_idx == 0: self.robotJointsRotationList[joint_name] = limb_IMU.roll     # 滚转关节运动角弧度 [0, 2π)
+                            elif joint_idx == 1: self.robotJointsRotationList[joint_name] = limb_IMU.pitch  # 俯仰关节运动角弧度 [0, 2π)
+                            elif joint_idx == 2: self.robotJointsRotationList[joint_name] = limb_IMU.yaw    # 偏航关节运动角弧度 [0, 2π)
+                            else: continue
+                            self.robotJointsRotationArray[self.robotJointsIndexDict[joint_name]] = self.robotJointsRotationList[joint_name]
                         else: pass
-                    else: pass
 
     def calibrate_AllLimbsIMU(self):
         """ 校准所有肢体传感器
@@ -134,12 +278,74 @@ class RobotIMUs:
             self.isCalibrated = False   # 防错措施
             return False
 
+    async def __aenter__(self):
+        """ 在当前事件循环上启动 asyncio 数据报端点
+        """
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: RobotIMUsProtocol(self), local_addr=("0.0.0.0", self.port))
+        self.isOpen = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """ 关闭 asyncio 数据报端点并结束所有订阅
+        """
+        self.isOpen = False                                 # 重置：服务开启标志
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self.sensorsState = 0x0000                          # 重置：传感器状态位标志
+        self.tempBuffer.clear()                             # 重置：临时缓冲区
+
+    def publish_Snapshot(self):
+        """ 向所有异步订阅者分发机器人关节运动列表快照（每次更新只复制一次）
+        """
+        snapshot = dict(self.robotJointsRotationList)
+        for subscriber in tuple(self.subscribers):          # 副本：接收线程与事件循环可能同时增删订阅者
+            subscriber.put(snapshot)
+
+    async def stream(self, rate: float = None, maxsize: int = None, policy: str = None):
+        """ 异步订阅机器人关节运动列表
+        用法: async with RobotIMUs(...) as robot: async for snapshot in robot.stream(rate=50): ...
+        （也可订阅由 start() 线程接收的 RobotIMUs：快照在接收线程中写入有界队列，仅经 call_soon_threadsafe 唤醒当前事件循环；stop() 会结束订阅。）
+        :param rate: float | None   最大交付频率 Hz (默认: 不限)
+        :param maxsize: int | None  队列容量 (默认: 8)
+        :param policy: str | None   队列满时的策略 "drop_oldest" | "coalesce" (默认: drop_oldest)
+        :return: AsyncIterator[dict]
+        """
+        subscriber = StreamSubscriber(maxsize, policy)
+        self.subscribers.append(subscriber)
+        period = 1.0 / rate if rate else 0.0
+        deadline = time.monotonic()
+        try:
+            while True:
+                snapshot = await subscriber.get()
+                if snapshot is None:
+                    return
+                yield snapshot
+                # 频率控制：等待期间到达的数据按策略入队
+                if period > 0.0:
+                    deadline = max(deadline + period, time.monotonic())
+                    await asyncio.sleep(deadline - time.monotonic())
+        finally:
+            self.subscribers.remove(subscriber)
+
+    def subscriberStatistics(self) -> list:
+        """ 读取所有异步订阅者的计数器
+        :return: list  [dict]
+        """
+        return [subscriber.statistics() for subscriber in self.subscribers]
+
     def stop(self):
         """ 停止 UDP 服务
         """
         self.isOpen = False             # 重置：服务开启标志
         self.sensorsState = 0x0000      # 重置：传感器状态位标志
         self.tempBuffer.clear()         # 重置：临时缓冲区
+        for subscriber in tuple(self.subscribers):
+            subscriber.close()          # 结束：异步订阅（跨线程时经 call_soon_threadsafe 唤醒）
         try:
             self.socket.close()
         except:
@@ -156,6 +362,13 @@ def updateData(jointRotaionDict: dict):
     print(jointRotaionDict)
 
 
+# 异步订阅示例
+async def streamData():
+    async with RobotIMUs(port=1399) as robot:
+        async for snapshot in robot.stream(rate=10, policy="coalesce"):
+            print(snapshot)
+
+
 if __name__ == '__main__':
     # 加载 UDP 服务
     server = RobotIMUs(port=1399, callback_method=updateData)
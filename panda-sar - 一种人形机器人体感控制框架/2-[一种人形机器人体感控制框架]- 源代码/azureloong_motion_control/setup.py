@@ -11,7 +11,7 @@ setup(
             ['resource/' + package_name]),
         ('share/' + package_name, ['package.xml']),
     ],
-    install_requires=['setuptools'],
+    install_requires=['setuptools', 'numpy', 'onnxruntime'],
     zip_safe=True,
     maintainer='strtrek',
     maintainer_email='geyuanji@strtrek.com',